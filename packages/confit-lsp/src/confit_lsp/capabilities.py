@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Callable, Self
 
 
@@ -6,6 +7,7 @@ from lsprotocol.types import Location
 from pydantic import BaseModel
 
 from .inspection import get_function_location, get_pydantic_input_model
+from .utils import cached_property
 
 
 @dataclass
@@ -16,20 +18,83 @@ class FunctionDescription:
     return_type: type
     docstring: str | None
 
+    @cached_property
+    def field_names(self) -> frozenset[str]:
+        """Names of the arguments accepted by the factory."""
+        return frozenset(self.input_model.model_fields)
+
+    @cached_property
+    def required_field_names(self) -> frozenset[str]:
+        """Names of the arguments that do not have a default value."""
+        return frozenset(
+            key
+            for key, info in self.input_model.model_fields.items()
+            if info.is_required()
+        )
+
+    @cached_property
+    def fast_checks(self) -> dict[str, type]:
+        """Fields annotated with a plain primitive type.
+
+        For those, an exact type match on the value proves validity
+        without going through pydantic; any mismatch still falls back to
+        full validation (which may coerce, e.g. int to float).
+        """
+        return {
+            key: info.annotation
+            for key, info in self.input_model.model_fields.items()
+            if info.annotation in (str, int, float, bool)
+        }
+
+    @cached_property
+    def return_type_name(self) -> str:
+        """Display name of the return type."""
+        return getattr(self.return_type, "__qualname__", str(self.return_type))
+
+    @cached_property
+    def _field_type_names(self) -> dict[str, str]:
+        return {}
+
+    def field_type_name(self, key: str) -> str:
+        """Display name of a field's annotation, memoized per field."""
+        name = self._field_type_names.get(key)
+
+        if name is None:
+            annotation = self.input_model.model_fields[key].annotation
+            name = getattr(annotation, "__qualname__", str(annotation))
+            self._field_type_names[key] = name
+
+        return name
+
     @classmethod
     def from_function(
         cls,
         name: str,
         func: Callable,
     ) -> Self:
-        location = get_function_location(func)
-        input_model, return_type = get_pydantic_input_model(func)
-        docstring = func.__doc__
-
-        return cls(
-            name=name,
-            docstring=docstring,
-            location=location,
-            input_model=input_model,
-            return_type=return_type,
-        )
+        return _describe(cls, name, func)
+
+
+@lru_cache(maxsize=None)
+def _describe(
+    cls: type[FunctionDescription],
+    name: str,
+    func: Callable,
+) -> FunctionDescription:
+    """Build a description once per ``(name, func)`` pair.
+
+    Descriptions are pure functions of the factory, and building the
+    pydantic input model is expensive. The registry keeps a strong
+    reference to every factory, so cache entries stay valid.
+    """
+    location = get_function_location(func)
+    input_model, return_type = get_pydantic_input_model(func)
+    docstring = func.__doc__
+
+    return cls(
+        name=name,
+        docstring=docstring,
+        location=location,
+        input_model=input_model,
+        return_type=return_type,
+    )
@@ -1,5 +1,4 @@
-from dataclasses import dataclass
-from functools import cached_property
+from dataclasses import dataclass, field
 import logging
 from typing import Any, Literal, Self, Sequence, assert_never
 from lsprotocol.types import Position, Range
@@ -10,11 +9,12 @@ from collections import deque
 
 from .parsers import parse_toml
 from .parsers import ElementPath
+from .utils import cached_property
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class ConfigurationView:
     data: dict[str, Any]
     """The actual data."""
@@ -25,6 +25,10 @@ class ConfigurationView:
     values: dict[ElementPath, Range]
     """Value path to range lookup table."""
 
+    _cache: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    """Storage for the cached properties (slotted instances have no
+    ``__dict__``)."""
+
     @cached_property
     def path_range(self) -> list[tuple[ElementPath, Range]]:
         result = list[tuple[ElementPath, Range]]()
@@ -37,6 +41,24 @@ class ConfigurationView:
 
         return result
 
+    @cached_property
+    def path_to_object(self) -> dict[ElementPath, dict[str, Any]]:
+        """Every nested object in the data, keyed by its path."""
+        result = dict[ElementPath, dict[str, Any]]()
+
+        to_visit = deque[tuple[ElementPath, dict[str, Any]]]()
+        to_visit.append(((), self.data))
+
+        while len(to_visit) > 0:
+            path, data = to_visit.popleft()
+            result[path] = data
+
+            for key, value in data.items():
+                if isinstance(value, dict):
+                    to_visit.append(((*path, key), value))
+
+        return result
+
     @cached_property
     def references(self) -> dict[ElementPath, ElementPath]:
         """In-document references."""
@@ -97,16 +119,31 @@ class ConfigurationView:
         self,
         path: Sequence[str],
     ) -> dict[str, Any]:
-        """Get the underlying object at a given path by recursively querying keys."""
+        """Get the underlying object at a given path."""
+        return self.path_to_object[tuple(path)]
 
-        d = self.data
+    @cached_property
+    def key_items(self) -> list[tuple[ElementPath, str, Range]]:
+        """The ``keys`` table, pre-split into ``(parent path, key, range)``.
 
-        for key in path:
-            d = d[key]
+        Saves hot loops (e.g. inlay hints) from decomposing every path
+        tuple on each request.
+        """
+        return [(path[:-1], path[-1], location) for path, location in self.keys.items()]
 
-        return d
+    @cached_property
+    def key_items_by_line(self) -> list[tuple[ElementPath, str, Range]]:
+        """``key_items``, sorted by starting line."""
+        return sorted(self.key_items, key=lambda item: item[2].start.line)
 
-    def factories(self) -> list[ElementPath]:
+    @cached_property
+    def key_start_lines(self) -> list[int]:
+        """Starting lines of ``key_items_by_line``, for binary search."""
+        return [item[2].start.line for item in self.key_items_by_line]
+
+    @cached_property
+    def factory_paths(self) -> list[ElementPath]:
+        """Paths to the elements that declare a factory."""
         result = list[ElementPath]()
         for path in self.keys.keys():
             *path, key = path
@@ -119,16 +156,28 @@ class ConfigurationView:
         cls,
         content: str,
     ) -> Self:
-        data = rtoml.loads(content)
+        data, parsed_elements = parse_toml(content)
+
+        if data is None:
+            # The document uses constructs the single-pass parser does
+            # not reconstruct (arrays, dates...): parse it fully.
+            data = rtoml.loads(content)
 
         keys = dict[ElementPath, Range]()
         values = dict[ElementPath, Range]()
 
-        for kind, element in parse_toml(content):
+        # Share a single canonical tuple per path (components are already
+        # interned by the parser): equal paths then compare by identity,
+        # which speeds up the many dict lookups keyed on them.
+        canonical = dict[ElementPath, ElementPath]()
+
+        for kind, element in parsed_elements:
+            path = canonical.setdefault(element.path, element.path)
+
             if kind == "key":
-                keys[element.path] = element.location
+                keys[path] = element.location
             elif kind == "value":
-                values[element.path] = element.location
+                values[path] = element.location
             else:
                 assert_never(kind)
 
@@ -1,14 +1,40 @@
+import functools
 import inspect
 from typing import Callable, Any, get_type_hints
 from pydantic import BaseModel, ConfigDict, create_model
 
 
+@functools.lru_cache(maxsize=None)
+def _type_hints(func: Callable) -> dict[str, Any]:
+    """Resolve a function's type hints, as cheaply as possible.
+
+    ``get_type_hints`` re-evaluates forward references against the
+    function's globals on every call; when none of the annotations are
+    strings, the raw ``__annotations__`` mapping is already resolved and
+    can be returned directly.
+    """
+    annotations = getattr(func, "__annotations__", {})
+
+    if not any(isinstance(value, str) for value in annotations.values()):
+        return annotations
+
+    try:
+        return get_type_hints(func, include_extras=True)
+    except Exception:
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
 def get_pydantic_input_model(
     func: Callable,
 ) -> tuple[type[BaseModel], Any]:
     """
     Convert a function signature to a Pydantic model for input validation.
 
+    Memoized per function: factories are module-level callables held by
+    the registry, so they are hashable and identity-stable, and
+    ``create_model`` is far too expensive to re-run per request.
+
     Args:
         func: The function to inspect.
 
@@ -17,10 +43,7 @@ def get_pydantic_input_model(
     """
     sig = inspect.signature(func)
 
-    try:
-        type_hints = get_type_hints(func, include_extras=True)
-    except Exception:
-        type_hints = {}
+    type_hints = _type_hints(func)
 
     # Build field definitions for Pydantic model
     fields = {}
@@ -2,13 +2,21 @@
 TOML LSP Server with element validation and hover support.
 """
 
+import asyncio
+import bisect
+import functools
 import logging
+import logging.handlers
+import os
+import queue
 from typing import Any, Optional
 
 from pydantic import TypeAdapter, ValidationError
+from pydantic.fields import FieldInfo
 from pygls.lsp.server import LanguageServer
 from lsprotocol.types import (
     TEXT_DOCUMENT_COMPLETION,
+    TEXT_DOCUMENT_DID_CHANGE,
     TEXT_DOCUMENT_DID_OPEN,
     TEXT_DOCUMENT_DID_SAVE,
     INITIALIZE,
@@ -19,6 +27,7 @@ from lsprotocol.types import (
     CompletionItemKind,
     CompletionList,
     CompletionParams,
+    DidChangeTextDocumentParams,
     DidOpenTextDocumentParams,
     DidSaveTextDocumentParams,
     Diagnostic,
@@ -32,6 +41,7 @@ from lsprotocol.types import (
     MarkupContent,
     MarkupKind,
     Location,
+    Range,
     HoverParams,
     DefinitionParams,
     InitializeParams,
@@ -44,144 +54,448 @@ from .parsers.types import ElementPath
 from .capabilities import FunctionDescription
 
 
-logging.basicConfig(
-    filename="/tmp/config-lsp.log",
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+def _setup_logging() -> None:
+    """Route log records through a queue.
+
+    A plain file handler writes synchronously on every record, right in
+    the request path; a QueueHandler makes emission a queue put, with a
+    background listener doing the actual I/O. The level defaults to INFO
+    and can be raised via ``CONFIT_LSP_LOG_LEVEL``.
+    """
+    handler = logging.FileHandler("/tmp/config-lsp.log")
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    )
+
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(os.environ.get("CONFIT_LSP_LOG_LEVEL", "INFO"))
+
+
+_setup_logging()
 
 # In your server code
 logger = logging.getLogger(__name__)
 logger.info("LSP server started")
 
 
+MAX_DIAGNOSTICS = 200
+"""Upper bound on published diagnostics, to keep pathological documents
+(e.g. dozens of factories with every required argument missing) from
+freezing the client."""
+
+
 class ConfitLanguageServer(LanguageServer):
     """Language server for the Confit configuration system."""
 
+    VALIDATION_DELAY = 0.2
+    """Debounce delay (in seconds) before validating a modified document."""
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._views = dict[str, tuple[int, ConfigurationView]]()
+        self._views = dict[str, tuple[int | None, int, ConfigurationView]]()
+        self._debounce_tasks = dict[str, asyncio.Task]()
+        self._locks = dict[str, asyncio.Lock]()
+        self._diagnostics = dict[str, tuple[ConfigurationView, list[Diagnostic]]]()
+        self._last_published = dict[str, tuple]()
+        self._completions: tuple[int, list[CompletionItem]] | None = None
+
+    @property
+    def factory_completions(self) -> list[CompletionItem]:
+        """Completion items for every registered factory.
+
+        The items do not depend on the document, so they are built once
+        and rebuilt only if the registry has grown (e.g. a plugin loaded
+        late).
+        """
+        if self._completions is not None:
+            size, items = self._completions
+            if size == len(REGISTRY):
+                return items
+
+        items = list[CompletionItem]()
+        for factory_name, factory in REGISTRY.items():
+            description = FunctionDescription.from_function(factory_name, factory)
+
+            docstring = description.docstring or "N/A"
+
+            items.append(
+                CompletionItem(
+                    label=factory_name,
+                    kind=CompletionItemKind.Value,
+                    detail=docstring[:50] + "..."
+                    if len(docstring) > 50
+                    else description.docstring,
+                    documentation=MarkupContent(
+                        kind=MarkupKind.Markdown,
+                        value=f"**{factory_name}**\n\n{description.docstring}",
+                    ),
+                    insert_text=f"{factory_name}",
+                    insert_text_format=InsertTextFormat.PlainText,
+                )
+            )
+
+        self._completions = (len(REGISTRY), items)
+
+        return items
 
     def parse(
         self,
         text_document: TextDocument,
     ) -> ConfigurationView | None:
         uri = text_document.uri
+
+        if not is_toml_uri(uri):
+            return None
+
+        # The LSP protocol guarantees monotonically increasing versions,
+        # which makes for a much cheaper first-level cache key than
+        # hashing the source. On a version mismatch, the source hash
+        # still catches reverts to known content (e.g. undo/redo).
+        version = text_document.version
         source = text_document.source
-        source_hash = hash(source)
 
-        if uri in self._views:
-            h, view = self._views[uri]
-            if h == source_hash:
+        if (cached := self._views.get(uri)) is not None:
+            v, h, view = cached
+
+            if version is not None and v == version:
                 return view
 
-        if not uri.endswith(".toml"):
-            return None
+            if h == hash(source):
+                self._views[uri] = (version, h, view)
+                return view
 
-        view = ConfigurationView.from_source(text_document.source)
+        view = ConfigurationView.from_source(source)
 
-        self._views[uri] = (source_hash, view)
+        self._views[uri] = (version, hash(source), view)
 
         return view
 
+    def schedule_validation(self, text_document: TextDocument) -> None:
+        """Schedule a debounced validation run for the given document.
+
+        Rapid open/save bursts only trigger a single validation: each call
+        cancels the pending task for the document's URI, so only the last
+        event in a burst actually runs.
+        """
+        uri = text_document.uri
+
+        if (pending := self._debounce_tasks.get(uri)) is not None:
+            pending.cancel()
+
+        self._debounce_tasks[uri] = asyncio.create_task(
+            self._debounced_validate(text_document, delay=self.VALIDATION_DELAY)
+        )
+
+    async def _debounced_validate(
+        self,
+        text_document: TextDocument,
+        delay: float,
+    ) -> None:
+        await asyncio.sleep(delay)
+
+        uri = text_document.uri
+
+        # Serialize validation per URI: overlapping events validate the
+        # same view, and the second run reuses the first one's result.
+        lock = self._locks.setdefault(uri, asyncio.Lock())
+
+        async with lock:
+            # The task is fire-and-forget: an exception here would only
+            # show up as an "exception was never retrieved" warning and
+            # the diagnostics would never update. Half-typed documents
+            # routinely fail to parse, so just log and wait for the next
+            # edit.
+            try:
+                view = self.parse(text_document)
+            except Exception:
+                logger.debug("Could not parse %s", uri, exc_info=True)
+                return
+
+            if view is None:
+                return
+
+            cached = self._diagnostics.get(uri)
+            if cached is not None and cached[0] is view:
+                diagnostics = cached[1]
+            else:
+                # Validation is CPU-bound (pydantic schema compilation
+                # and validation); run it off the event loop so hover or
+                # completion requests are not stuck behind it.
+                diagnostics = await asyncio.get_running_loop().run_in_executor(
+                    None, validate_config, view
+                )
+                self._diagnostics[uri] = (view, diagnostics)
+
+            # Skip the JSON-RPC round-trip (and the client re-render)
+            # when the diagnostics have not changed, e.g. on autosaves
+            # or whitespace-only edits.
+            signature = tuple(
+                (
+                    d.range.start.line,
+                    d.range.start.character,
+                    d.range.end.line,
+                    d.range.end.character,
+                    d.severity,
+                    d.message,
+                )
+                for d in diagnostics
+            )
+
+            if self._last_published.get(uri) == signature:
+                return
+
+            self._last_published[uri] = signature
+
+            payload = PublishDiagnosticsParams(
+                uri=uri,
+                diagnostics=diagnostics,
+            )
+            self.text_document_publish_diagnostics(payload)
+
 
 server = ConfitLanguageServer("confit-lsp", "v0.1")
 
 
+def is_toml_uri(uri: str) -> bool:
+    """Whether the URI points at a TOML document."""
+    return uri.endswith(".toml")
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_adapter(annotation: Any) -> TypeAdapter:
+    return TypeAdapter(annotation)
+
+
+_adapters_by_repr = dict[str, TypeAdapter]()
+
+
+def get_adapter(annotation: Any) -> TypeAdapter:
+    """Get a (memoized) ``TypeAdapter`` for the given annotation.
+
+    Adapter construction compiles a pydantic-core schema, by far the
+    dominant cost of validating a field. Hashable annotations (including
+    equal-but-non-identical ones) go through the lru_cache; unhashable
+    annotations (e.g. ``Annotated`` carrying unhashable metadata) are
+    keyed by their repr instead, since pydantic schemas only depend on
+    the structural type."""
+    try:
+        return _cached_adapter(annotation)
+    except TypeError:
+        pass
+
+    key = repr(annotation)
+    adapter = _adapters_by_repr.get(key)
+
+    if adapter is None:
+        adapter = _adapters_by_repr[key] = TypeAdapter(annotation)
+
+    return adapter
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert a parsed value to a hashable equivalent.
+
+    Containers and leaves are tagged with their type: ``True == 1`` and
+    ``[1] == (1,)`` after a plain conversion, but they validate
+    differently against ``Strict`` or ``Literal`` annotations, so cache
+    hits must require genuinely identical inputs.
+    """
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((key, _freeze(v)) for key, v in value.items())))
+    if isinstance(value, list):
+        return (list, tuple(_freeze(v) for v in value))
+    return (type(value), value)
+
+
+_field_validation_cache = dict[Any, tuple[str, ...]]()
+
+_FIELD_VALIDATION_CACHE_SIZE = 4096
+
+
+def validate_field(annotation: Any, value: Any) -> tuple[str, ...]:
+    """Validate a value against an annotation, returning error messages.
+
+    Outcomes are memoized on the (annotation, value) pair so unchanged
+    arguments skip pydantic entirely across validation runs; callers
+    replay the messages against the current element ranges. Unhashable
+    pairs simply bypass the cache.
+    """
+    try:
+        key = (annotation, _freeze(value))
+        hash(key)
+    except TypeError:
+        key = None
+
+    if key is not None and (cached := _field_validation_cache.get(key)) is not None:
+        return cached
+
+    try:
+        get_adapter(annotation).validate_python(value)
+        errors = tuple[str, ...]()
+    except ValidationError as e:
+        errors = tuple(error["msg"] for error in e.errors())
+
+    if key is not None:
+        if len(_field_validation_cache) >= _FIELD_VALIDATION_CACHE_SIZE:
+            _field_validation_cache.clear()
+        _field_validation_cache[key] = errors
+
+    return errors
+
+
+def factory_descriptions(
+    view: ConfigurationView,
+) -> dict[ElementPath, FunctionDescription]:
+    """Describe every known factory declared in the view.
+
+    Unknown or malformed factory declarations are skipped; ``from_function``
+    is memoized, so this amounts to a handful of dict lookups per call.
+    """
+    factories = dict[ElementPath, FunctionDescription]()
+
+    for path in view.factory_paths:
+        factory_name = view.get_value((*path, "factory"))
+
+        if not isinstance(factory_name, str):
+            continue
+
+        factory = REGISTRY.get(factory_name)
+
+        if factory is None:
+            continue
+
+        factories[path] = FunctionDescription.from_function(factory_name, factory)
+
+    return factories
+
+
 def validate_config(view: ConfigurationView) -> list[Diagnostic]:
     """Validate .toml and return diagnostics"""
 
-    diagnostics = []
+    diagnostics = list[Diagnostic]()
 
-    factories = dict[ElementPath, FunctionDescription]()
+    def emit(diagnostic: Diagnostic) -> bool:
+        """Record a diagnostic; True once the budget is exhausted."""
+        diagnostics.append(diagnostic)
+        return len(diagnostics) >= MAX_DIAGNOSTICS
 
-    for path in view.factories():
-        path = (*path, "factory")
-        location = view.values[path]
+    factories = dict[ElementPath, FunctionDescription]()
+    factory_elements = dict[ElementPath, Range]()
+
+    # Bind the view tables once: `references` and friends are cached
+    # properties, and going through the descriptor in the inner loops
+    # below costs a dict probe per access.
+    keys = view.keys
+    values = view.values
+    references = view.references
+    path_to_object = view.path_to_object
+    registry = REGISTRY
+
+    for root_path in view.factory_paths:
+        path = (*root_path, "factory")
+        location = values[path]
         factory_name = view.get_value(path)
 
         if not isinstance(factory_name, str):
-            diagnostics.append(
+            if emit(
                 Diagnostic(
                     range=location,
                     message=f"Element value must be a string, got {type(factory_name).__name__}",
                     severity=DiagnosticSeverity.Error,
                     source="confit-lsp",
                 )
-            )
+            ):
+                return diagnostics
             continue
 
-        if factory_name not in REGISTRY:
-            diagnostics.append(
+        factory = registry.get(factory_name)
+
+        if factory is None:
+            if emit(
                 Diagnostic(
                     range=location,
                     message=f"Element '{factory_name}' not found in the registry.",
                     severity=DiagnosticSeverity.Error,
                     source="confit-lsp",
                 )
-            )
+            ):
+                return diagnostics
             continue
 
-        factories[path[:-1]] = FunctionDescription.from_function(
+        factories[root_path] = FunctionDescription.from_function(
             factory_name,
-            REGISTRY[factory_name],
+            factory,
         )
+        factory_elements[root_path] = keys[path]
 
     for path, factory in factories.items():
-        root = view.get_object(path).copy()
-        root_keys = set(root.keys()) - {"factory"}
-
-        model_keys = set(factory.input_model.model_fields.keys())
-        required_model_keys = set(
-            key
-            for key, info in factory.input_model.model_fields.items()
-            if info.is_required()
-        )
+        # The keys are only read, so there is no need for a defensive copy.
+        root = path_to_object[path]
+
+        # Classify every argument in a single pass over the model fields;
+        # whatever remains in `extra_keys` is unknown to the factory.
+        extra_keys = root.keys() - {"factory"}
+        present = list[tuple[str, FieldInfo]]()
+        missing_keys = list[str]()
+
+        required_field_names = factory.required_field_names
+
+        for key, info in factory.input_model.model_fields.items():
+            if key in extra_keys:
+                extra_keys.discard(key)
+                present.append((key, info))
+            elif key in required_field_names:
+                missing_keys.append(key)
 
-        extra_keys = root_keys - model_keys
         for key in extra_keys:
-            diagnostics.append(
+            if emit(
                 Diagnostic(
-                    range=view.keys[(*path, key)],
+                    range=keys[(*path, key)],
                     message=f"Argument `{key}` is not recognized by `{factory.name}` and will be ignored.",
                     severity=DiagnosticSeverity.Warning,
                     source="confit-lsp",
                 )
-            )
+            ):
+                return diagnostics
 
-        factory_element = view.keys[(*path, "factory")]
-        missing_keys = required_model_keys - root_keys
+        factory_element = factory_elements[path]
         for key in missing_keys:
-            diagnostics.append(
+            if emit(
                 Diagnostic(
                     range=factory_element,
                     message=f"Argument `{key}` is missing.",
                     severity=DiagnosticSeverity.Error,
                     source="confit-lsp",
                 )
-            )
+            ):
+                return diagnostics
 
-        for key in root_keys & model_keys:
-            info = factory.input_model.model_fields[key]
+        for key, info in present:
             value = root[key]
 
             total_path = (*path, key)
 
-            target = view.references.get(total_path)
+            target = references.get(total_path)
 
             if target is not None:
-                element = view.keys[total_path]
+                element = keys[total_path]
                 try:
                     view.get_value(target)
                 except KeyError:
-                    diagnostics.append(
+                    if emit(
                         Diagnostic(
                             range=element,
                             message="No element with this key exists.",
                             severity=DiagnosticSeverity.Error,
                             source="confit-lsp",
                         )
-                    )
+                    ):
+                        return diagnostics
                     continue
                 total_path = target
 
@@ -192,34 +506,38 @@ def validate_config(view: ConfigurationView) -> list[Diagnostic]:
                     continue
 
                 if sub_factory_descriptor.return_type != info.annotation:
-                    diagnostics.append(
+                    if emit(
                         Diagnostic(
                             range=factory_element,
                             message=(
                                 f"Argument `{key}` is provided by a factory with incompatible type.\n"
-                                f"Expected `{info.annotation.__qualname__}`, got `{sub_factory_descriptor.return_type.__qualname__}`."
+                                f"Expected `{factory.field_type_name(key)}`, got `{sub_factory_descriptor.return_type_name}`."
                             ),
                             severity=DiagnosticSeverity.Error,
                             source="confit-lsp",
                         )
-                    )
+                    ):
+                        return diagnostics
                 continue
 
-            try:
-                adapter = TypeAdapter(info.annotation)
-                adapter.validate_python(value)
-            except ValidationError as e:
-                element = view.keys[total_path]
-                for error in e.errors():
-                    msg = error["msg"]
-                    diagnostics.append(
+            # Exact primitive matches are provably valid: skip pydantic.
+            if factory.fast_checks.get(key) is type(value):
+                continue
+
+            errors = validate_field(info.annotation, value)
+
+            if errors:
+                element = keys[total_path]
+                for msg in errors:
+                    if emit(
                         Diagnostic(
                             range=element,
                             message=f"Argument `{key}` has incompatible type.\n{msg}",
                             severity=DiagnosticSeverity.Error,
                             source="confit-lsp",
                         )
-                    )
+                    ):
+                        return diagnostics
 
     return diagnostics
 
@@ -234,55 +552,40 @@ async def initialize(params: InitializeParams) -> None:
 async def did_open(ls: ConfitLanguageServer, params: DidOpenTextDocumentParams):
     """Handle document open event"""
 
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    view = ls.parse(doc)
-
-    if view is None:
+    if not is_toml_uri(params.text_document.uri):
         return
 
-    diagnostics = validate_config(view)
-    payload = PublishDiagnosticsParams(
-        uri=doc.uri,
-        diagnostics=diagnostics,
-    )
-    ls.text_document_publish_diagnostics(payload)
+    doc = ls.workspace.get_text_document(params.text_document.uri)
+    ls.schedule_validation(doc)
 
 
 @server.feature(TEXT_DOCUMENT_DID_SAVE)
 async def did_save(ls: ConfitLanguageServer, params: DidSaveTextDocumentParams):
     """Handle document save event"""
-    doc = ls.workspace.get_text_document(params.text_document.uri)
-    view = ls.parse(doc)
-
-    if view is None:
+    if not is_toml_uri(params.text_document.uri):
         return
 
-    diagnostics = validate_config(view)
-    payload = PublishDiagnosticsParams(
-        uri=doc.uri,
-        diagnostics=diagnostics,
-    )
-    ls.text_document_publish_diagnostics(payload)
+    doc = ls.workspace.get_text_document(params.text_document.uri)
+    ls.schedule_validation(doc)
 
 
-# @server.feature(TEXT_DOCUMENT_DID_CHANGE)
-# async def did_change(ls: LanguageServer, params: DidChangeTextDocumentParams):
-#     """Handle document change event"""
-#     doc = ls.workspace.get_text_document(params.text_document.uri)
-#
-#     if doc.uri.endswith(".toml"):
-#         diagnostics = validate_config(doc)
-#         payload = PublishDiagnosticsParams(
-#             uri=doc.uri,
-#             diagnostics=diagnostics,
-#         )
-#         ls.text_document_publish_diagnostics(payload)
+@server.feature(TEXT_DOCUMENT_DID_CHANGE)
+async def did_change(ls: ConfitLanguageServer, params: DidChangeTextDocumentParams):
+    """Handle document change event"""
+    if not is_toml_uri(params.text_document.uri):
+        return
+
+    doc = ls.workspace.get_text_document(params.text_document.uri)
+    ls.schedule_validation(doc)
 
 
 @server.feature(TEXT_DOCUMENT_HOVER)
 async def hover(ls: ConfitLanguageServer, params: HoverParams) -> Optional[Hover]:
     """Provide hover information for factories"""
 
+    if not is_toml_uri(params.text_document.uri):
+        return None
+
     doc = ls.workspace.get_text_document(params.text_document.uri)
     view = ls.parse(doc)
 
@@ -337,6 +640,9 @@ async def definition(
     ls: ConfitLanguageServer,
     params: DefinitionParams,
 ) -> Location | None:
+    if not is_toml_uri(params.text_document.uri):
+        return None
+
     doc = ls.workspace.get_text_document(params.text_document.uri)
     view = ls.parse(doc)
 
@@ -381,6 +687,9 @@ async def completion(
     params: CompletionParams,
 ) -> Optional[CompletionList]:
     """Provide auto-completion for element values"""
+    if not is_toml_uri(params.text_document.uri):
+        return None
+
     doc = ls.workspace.get_text_document(params.text_document.uri)
     view = ls.parse(doc)
 
@@ -401,30 +710,7 @@ async def completion(
     if key != "factory":
         return None
 
-    # Create completion items for all elements
-    items = []
-    for factory_name, factory in REGISTRY.items():
-        description = FunctionDescription.from_function(factory_name, factory)
-
-        docstring = description.docstring or "N/A"
-
-        items.append(
-            CompletionItem(
-                label=factory_name,
-                kind=CompletionItemKind.Value,
-                detail=docstring[:50] + "..."
-                if len(docstring) > 50
-                else description.docstring,
-                documentation=MarkupContent(
-                    kind=MarkupKind.Markdown,
-                    value=f"**{factory_name}**\n\n{description.docstring}",
-                ),
-                insert_text=f"{factory_name}",
-                insert_text_format=InsertTextFormat.PlainText,
-            )
-        )
-
-    return CompletionList(is_incomplete=False, items=items)
+    return CompletionList(is_incomplete=False, items=ls.factory_completions)
 
 
 @server.feature(TEXT_DOCUMENT_INLAY_HINT)
@@ -432,6 +718,9 @@ def inlay_hints(
     ls: ConfitLanguageServer,
     params: InlayHintParams,
 ):
+    if not is_toml_uri(params.text_document.uri):
+        return None
+
     doc = ls.workspace.get_text_document(params.text_document.uri)
     view = ls.parse(doc)
 
@@ -443,22 +732,18 @@ def inlay_hints(
     start = params.range.start
     end = params.range.end
 
-    factories = dict[ElementPath, FunctionDescription]()
-    for path in view.factories():
-        factory_name = view.get_value((*path, "factory"))
-        factory = REGISTRY.get(factory_name)
+    factories = factory_descriptions(view)
 
-        if factory is None:
-            continue
-
-        factories[path] = FunctionDescription.from_function(factory_name, factory)
+    # Narrow down to the keys whose line falls within the requested
+    # range; the precise check below only runs on that slice.
+    lines = view.key_start_lines
+    lo = bisect.bisect_left(lines, start.line)
+    hi = bisect.bisect_right(lines, end.line)
 
-    for path, location in view.keys.items():
+    for path, key, location in view.key_items_by_line[lo:hi]:
         if location.start > end or start > location.end:
             continue
 
-        path, key = path[:-1], path[-1]
-
         if key == "factory":
             continue
 
@@ -469,20 +754,12 @@ def inlay_hints(
 
         field_info = factory.input_model.model_fields.get(key)
 
-        if field_info is None:
-            continue
-
-        annotation = getattr(field_info.annotation, "__name__", None)
-
-        if annotation is None:
-            annotation = field_info.annotation and str(field_info.annotation) or None
-
-        if annotation is None:
+        if field_info is None or field_info.annotation is None:
             continue
 
         hints.append(
             InlayHint(
-                label=f": {annotation}",
+                label=f": {factory.field_type_name(key)}",
                 kind=InlayHintKind.Type,
                 padding_left=False,
                 padding_right=False,
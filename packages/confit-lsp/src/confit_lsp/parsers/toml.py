@@ -1,4 +1,5 @@
-from typing import Iterator
+import sys
+from typing import Any
 from persil import string, regex
 from persil.result import Ok
 from persil.utils import Span
@@ -38,7 +39,9 @@ toml_string = (basic_string | literal_string).desc("string")
 
 bare_key = regex(r"[A-Za-z0-9_-]+")
 quoted_key = toml_string
-key = (bare_key | quoted_key).desc("key")
+# Keys are interned: marker lookups (`key == "factory"`) and the path
+# tables downstream then compare pointers on the fast path.
+key = (bare_key | quoted_key).map(sys.intern).desc("key")
 
 dotted_keys = key.sep_by(whitespace >> dot << whitespace).map(tuple).desc("dotted-key")
 
@@ -46,7 +49,12 @@ table_title = (lbracket >> dotted_keys.span() << rbracket).desc("title")
 
 line_remainder = regex(r".*")
 
-value = (toml_string | regex(r"[^\s]+")).desc("value")
+# Values are tagged so that data reconstruction can tell quoted strings
+# apart from bare scalars (booleans, numbers, dates...).
+value = (
+    toml_string.map(lambda s: ("string", s))
+    | regex(r"[^\s]+").map(lambda s: ("scalar", s))
+).desc("value")
 
 key_value_pair = (
     dotted_keys.span()
@@ -65,30 +73,129 @@ element = (
 ).desc("element")
 
 
-def parse_toml(content: str) -> Iterator[tuple[Kind, Element]]:
+def _convert_scalar(tagged: tuple[str, str]) -> Any:
+    """Convert a tagged value to its Python equivalent.
+
+    Only handles the scalar subset of TOML (strings, booleans, integers
+    and floats); raises ``ValueError`` for anything else so that callers
+    can fall back to a full parser.
+    """
+    kind, raw = tagged
+
+    if kind == "string":
+        return raw
+    if raw == "true":
+        return True
+    if raw == "false":
+        return False
+
+    try:
+        return int(raw, 0)
+    except ValueError:
+        pass
+
+    return float(raw)
+
+
+def parse_toml(
+    content: str,
+) -> tuple[dict[str, Any] | None, list[tuple[Kind, Element]]]:
+    """Parse a TOML document in a single pass.
+
+    Returns the reconstructed data alongside the located elements. The
+    data is ``None`` when the document uses constructs the grammar does
+    not cover (arrays, inline tables, dates...) - callers should then
+    fall back to a full TOML parser.
+    """
     index = 0
     root = tuple[str, ...]()
 
+    data: dict[str, Any] | None = {}
+    elements = list[tuple[Kind, Element]]()
+
+    # The string rule reads a multiline basic/literal string as an empty
+    # (or truncated) one, so the reconstruction cannot be trusted.
+    if '"""' in content or "'''" in content:
+        data = None
+
     while isinstance(result := element.wrapped_fn(content, index), Ok):
         index = result.index
 
         match result.value:
             case ("title", span):
                 root = span.value
-                yield "key", Element(path=root, location=range_from_persil(span))
+                elements.append(
+                    ("key", Element(path=root, location=range_from_persil(span)))
+                )
+
+                if data is not None and _get_table(data, root) is None:
+                    data = None
             case ("kv", (key, value)):
                 path = root + key.value
-                yield (
-                    "key",
-                    Element(
-                        path=path,
-                        location=range_from_persil(key),
-                    ),
+                elements.append(
+                    (
+                        "key",
+                        Element(
+                            path=path,
+                            location=range_from_persil(key),
+                        ),
+                    )
                 )
-                yield (
-                    "value",
-                    Element(
-                        path=path,
-                        location=range_from_persil(value),
-                    ),
+                elements.append(
+                    (
+                        "value",
+                        Element(
+                            path=path,
+                            location=range_from_persil(value),
+                        ),
+                    )
                 )
+
+                if data is not None:
+                    try:
+                        converted = _convert_scalar(value.value)
+                    except ValueError:
+                        data = None
+                    else:
+                        data = _insert_value(data, path, converted)
+
+    # The grammar stops at anything it has no rule for (comment lines,
+    # a last line without a trailing newline...). A partial
+    # reconstruction would produce bogus diagnostics, so only keep it
+    # when the whole document was consumed.
+    if data is not None and content[index:].strip():
+        data = None
+
+    return data, elements
+
+
+def _get_table(
+    data: dict[str, Any],
+    path: tuple[str, ...],
+) -> dict[str, Any] | None:
+    """Get (creating as needed) the table at ``path``, or ``None`` on conflict."""
+    d = data
+
+    for part in path:
+        d = d.setdefault(part, {})
+        if not isinstance(d, dict):
+            return None
+
+    return d
+
+
+def _insert_value(
+    data: dict[str, Any],
+    path: tuple[str, ...],
+    value: Any,
+) -> dict[str, Any] | None:
+    """Set ``value`` at ``path``, or ``None`` on conflict."""
+    *parents, key = path
+
+    d = _get_table(data, tuple(parents))
+    if d is None:
+        return None
+
+    d[key] = value
+
+    return data
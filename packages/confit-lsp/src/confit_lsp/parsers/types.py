@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Iterator, Literal, Protocol
+from typing import Any, Literal, Protocol
 from lsprotocol.types import Range
 
 
@@ -24,6 +24,12 @@ Kind = Literal["key", "value"]
 
 
 class ConfigurationParser(Protocol):
-    """The protocol configuration parsers should adhere to."""
+    """The protocol configuration parsers should adhere to.
 
-    def __call__(self, content: str) -> Iterator[tuple[Kind, Element]]: ...
+    Parsers return the reconstructed data (or ``None`` when it could not
+    be derived in a single pass) alongside the located elements.
+    """
+
+    def __call__(
+        self, content: str
+    ) -> tuple[dict[str, Any] | None, list[tuple[Kind, Element]]]: ...
@@ -0,0 +1,37 @@
+from typing import Any, Callable, Self
+
+
+class cached_property[T]:
+    """A minimal, lock-free drop-in for ``functools.cached_property``.
+
+    On first access the value is computed and stored in the instance
+    ``__dict__``, which then shadows the descriptor entirely: subsequent
+    accesses are plain attribute lookups, with no sentinel check.
+
+    Slotted classes have no instance ``__dict__``; they can still use
+    this descriptor by defining a ``_cache: dict`` slot, which then holds
+    the computed values.
+    """
+
+    def __init__(self, func: Callable[[Any], T]) -> None:
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj: Any, cls: type | None = None) -> T | Self:
+        if obj is None:
+            return self
+
+        try:
+            cache = obj.__dict__
+        except AttributeError:
+            cache = obj._cache
+            if self.name in cache:
+                return cache[self.name]
+
+        value = self.func(obj)
+        cache[self.name] = value
+        return value
@@ -16,7 +16,30 @@ b = 42
 
 def test_factories():
     view = ConfigurationView.from_source(TOML)
-    assert view.factories == {
-        ("section",): "add",
-        ("section", "b"): "subtract",
+    assert view.factory_paths == [
+        ("section",),
+        ("section", "b"),
+    ]
+
+
+def test_data_reconstruction():
+    view = ConfigurationView.from_source(TOML)
+    assert view.data == {
+        "top-level": 3,
+        "section": {
+            "factory": "add",
+            "a": 9,
+            "b": {
+                "factory": "subtract",
+                "a": 0,
+                "b": 42,
+            },
+        },
     }
+
+
+def test_data_fallback():
+    # Comment lines stop the single-pass parser; the data must come from
+    # the full parser, not from a partial reconstruction.
+    view = ConfigurationView.from_source("a = 1\n# comment\nb = 2\n")
+    assert view.data == {"a": 1, "b": 2}